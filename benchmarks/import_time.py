@@ -0,0 +1,54 @@
+import subprocess
+import sys
+'''
+Import-time benchmark. Every module is imported in a fresh interpreter (as cron / API workers do),
+reporting the best wall time over a few runs and whether heavy optional dependencies were loaded.
+Usage, from the repository root: python benchmarks/import_time.py [repeats]
+'''
+
+MODULES = ['coffeecounter',
+           'coffeecounter.cleaning_skus',
+           'coffeecounter.join_transaction',
+           'coffeecounter.selling_channel_split',
+           'coffeecounter.measures',
+           'coffeecounter.sketches',
+           'coffeecounter.sku_matching',
+           'coffeecounter.forecasting',
+           'coffeecounter.to_web_data',
+           'coffeecounter.b2b_sales',
+           'coffeecounter.plot_functions',
+           'coffeecounter.regression_pipeline']
+
+HEAVY = ['matplotlib', 'seaborn', 'scipy', 'sklearn']
+
+SNIPPET = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, ','.join(m for m in {heavy!r} if m in sys.modules))
+'''
+
+
+def time_import(module, repeats=5):
+    '''
+    Import a module in fresh interpreters.
+    :param module: dotted module name
+    :param repeats: number of interpreters
+    :return: (best seconds, list of heavy modules loaded)
+    '''
+    best, heavy = float('inf'), []
+    for _ in range(repeats):
+        out = subprocess.check_output([sys.executable, '-c', SNIPPET.format(module=module, heavy=HEAVY)])
+        elapsed, _, loaded = out.decode().strip().partition(' ')
+        best = min(best, float(elapsed))
+        heavy = [m for m in loaded.split(',') if m]
+    return best, heavy
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print('{0:<40}{1:>10}  {2}'.format('module', 'ms', 'heavy deps loaded'))
+    for module in MODULES:
+        seconds, heavy = time_import(module, repeats)
+        print('{0:<40}{1:>10.1f}  {2}'.format(module, seconds * 1000, ', '.join(heavy) or '-'))
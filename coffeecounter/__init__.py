@@ -0,0 +1,7 @@
+'''
+Coffee sales analysis: SKU cleaning, transaction joins, channel splits, rollups and forecasts.
+Data-path modules (cleaning_skus, join_transaction, selling_channel_split, measures, sketches,
+sku_matching, forecasting, to_web_data, b2b_sales) only import pandas and numpy. Plotting, stats
+and ML dependencies are imported inside the functions that use them (plot_functions, regression_pipeline).
+Run scripts from the repository root, e.g. `python -m coffeecounter.to_web_data`.
+'''
@@ -1,12 +1,7 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from join_transaction import join_transaction_sku
-from selling_channel_split import splitting_channels
-from plot_functions import plot_trend_and_relationships
-from regression_pipeline import linear_regression, forecast_b2b
-from scipy.stats import norm
+from .join_transaction import filter_date
+from .sketches import hll_by_group, cumulative_distinct
 
 
 
@@ -16,7 +11,6 @@ def accum_customer_numbers(file):
     file: csv file that contain unique customer id and the first time they appeared in the system
     return dataframe contains monthly new customers
     '''
-    from join_transaction import filter_date
     all_customers = pd.read_csv(file)
     all_customers = filter_date(all_customers)
     all_customers_unique = all_customers[~all_customers.customer_id.duplicated()]
@@ -24,6 +18,20 @@ def accum_customer_numbers(file):
     all_customers_unique = all_customers_unique.resample('M').count().cumsum()
     return all_customers_unique
 
+def accum_customer_sketches(file, p=12):
+    '''
+    Approximate version of accum_customer_numbers. One HyperLogLog sketch of customer_id per month,
+    cumulative customers are the running union of the sketches, so no exact dedup over the full history.
+    file: csv file that contain customer id and the time they appeared in the system
+    p: HyperLogLog precision
+    return dataframe contains monthly (estimated) accumulated customers
+    '''
+    all_customers = filter_date(pd.read_csv(file))
+    all_customers['month'] = all_customers.created_at.dt.to_period('M').dt.to_timestamp()
+    sketches = hll_by_group(all_customers, ['month'], column='customer_id', p=p)
+    accum = cumulative_distinct(sketches).resample('M').last().ffill()
+    return accum.to_frame('customer_id')
+
 def elapsed_month(df):
     '''
     Calculate elapsed month since starting date
@@ -34,13 +42,15 @@ def elapsed_month(df):
     df['elapsed_month'] = np.linspace(1, length, length)
     return df
 
-def monthly_sales_vs_customers(file):
+def monthly_sales_vs_customers(df, file, approx=False):
     '''
     combining monthly sales with new customer numbers
+    :param df: transactions with created_at and lbs columns
     :param file: csv datafile contain unique customer id and the first time they appeared in the system
+    :param approx: if true, use HyperLogLog estimates of the customer numbers (accum_customer_sketches)
     :return: dataframe containing information
     '''
-    customers = accum_customer_numbers(file)
+    customers = accum_customer_sketches(file) if approx else accum_customer_numbers(file)
     monthly_sales = pd.DataFrame(df.set_index(df.created_at)['lbs'].resample('M').sum())
     monthly_sales = monthly_sales.join(customers)
     monthly_sales = elapsed_month(monthly_sales)
@@ -48,6 +58,16 @@ def monthly_sales_vs_customers(file):
 
 
 if __name__ == '__main__':
+    # plotting, stats and ML dependencies are only needed when running as a script
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from scipy.stats import norm
+    from .join_transaction import join_transaction_sku
+    from .selling_channel_split import splitting_channels
+    from .plot_functions import plot_trend_and_relationships
+    from .regression_pipeline import linear_regression
+    from .forecasting import forecast, backtest, backtest_summary
+
     # import all transaction data
     all_trans = join_transaction_sku('csv/workshop_skus_alltrans.csv',
                          'csv/SKU_header.csv',
@@ -56,7 +76,7 @@ if __name__ == '__main__':
     # slicing only b2b
     df = splitting_channels(all_trans, output = 'b2b')
     # monthly new customers added
-    monthly_sales = monthly_sales_vs_customers('csv/cw_customers.csv')
+    monthly_sales = monthly_sales_vs_customers(df, 'csv/cw_customers.csv')
     # plot trend
     plot_trend_and_relationships(monthly_sales.index, monthly_sales.customer_id, monthly_sales.lbs,
                                  time_locations='index',
@@ -70,6 +90,7 @@ if __name__ == '__main__':
     residuals = monthly_sales.lbs - customer_sales_reg.predict(monthly_sales.customer_id.values.reshape(-1, 1))
     sns.distplot(residuals, bins=10, fit=norm)
     plt.show()
-    # forecast 2018 b2b sales
-    forecast = forecast_b2b(2018, elapsed_month_customer_reg, customer_sales_reg)
+    # backtest over all historical cutoffs, then forecast next 12 months of b2b sales
+    print(backtest_summary(backtest(monthly_sales.lbs, horizon=12)))
+    sales_forecast = forecast(monthly_sales.lbs, horizon=12)
 
@@ -1,4 +1,5 @@
 import pandas as pd
+from .sku_matching import SkuMatcher
 '''
 This file is aiming at combining SKUs with/without detailed information.
 Unknown SKUs are identified via SKU encodings + keywords in the item_name column.
@@ -223,6 +224,46 @@ def excld_info(df):
     return jdf
 
 
+# matcher of the last documented catalog, reused across calls so its match cache persists
+MATCHER_CACHE = {}
+
+
+def catalog_matcher(incld_df):
+    '''
+    SkuMatcher over documented SKUs. The matcher is kept for the next call with the same catalog,
+    so item names that were already matched are not scored again.
+    :param incld_df: dataframe with documented SKU information
+    :return: SkuMatcher
+    '''
+    catalog = incld_df.dropna(subset=['item_name']).drop_duplicates('item_name')
+    key = pd.util.hash_pandas_object(catalog.astype(str), index=False).sum()
+    if key not in MATCHER_CACHE:
+        MATCHER_CACHE.clear()
+        MATCHER_CACHE[key] = SkuMatcher(catalog)
+    return MATCHER_CACHE[key]
+
+
+def match_unknown(excld_df, incld_df, threshold=0.5, matcher=None):
+    '''
+    Fuzzy match item names of undocumented SKUs whose origin could not be extracted ('Unknown')
+    to documented SKUs (see sku_matching), and copy the documented information over.
+    :param excld_df: dataframe returned by excld_info
+    :param incld_df: dataframe with documented SKU information
+    :param threshold: minimum match score (0-1)
+    :param matcher: SkuMatcher built on incld_df, defaults to the cached catalog_matcher(incld_df)
+    :return: excld_df with matched SKUs filled in.
+    '''
+    columns = ['sub_name', 'origin', 'blend', 'roast_level', 'type', 'cost', 'geisha', 'microlot']
+    if matcher is None:
+        matcher = catalog_matcher(incld_df)
+
+    unknown = excld_df.index[(excld_df.origin == 'Unknown') & excld_df.item_name.notnull()]
+    matches = matcher.match(excld_df.loc[unknown, 'item_name'], threshold)
+    matched = matches.match.values >= 0
+    excld_df.loc[unknown[matched], columns] = matcher.catalog.loc[matches.match.values[matched], columns].values
+    return excld_df
+
+
 def four_packs(df):
     ''''
     Take care of four pack products. multiply by 4 of their lbs.
@@ -292,13 +333,14 @@ def create_unit(jdf):
 
     return jdf
 
-def sku_header_detail_combination(file1, file2, file3, fileoutput = False):
+def sku_header_detail_combination(file1, file2, file3, fileoutput = False, fuzzy_match = False):
     '''
     Utlize all the functions to clean and join transaction skus and documented skus.
     :param file1: workshop_skus_alltrans.csv, all transaction skus from database.
     :param file2: sku_header.csv, documented skus (from excel)
     :param file3: sku_detail.csv, another part or infomation (fron excel)
     :param fileoutput: boolean, default False
+    :param fuzzy_match: boolean, default False. Match unknown origin SKUs to documented ones by item name.
     :return: output_df, a processed dataframe with all the infomation.
     '''
     skus = pd.read_csv(file1, usecols=(0, 1))
@@ -314,6 +356,8 @@ def sku_header_detail_combination(file1, file2, file3, fileoutput = False):
     # print(documented_sku.shape)
     incld_df, excld_df = all_skus(skus, documented_sku)
     excld_df = excld_info(excld_df)
+    if fuzzy_match:
+        excld_df = match_unknown(excld_df, incld_df)
     joint_df = pd.concat([incld_df, excld_df])
 
     # make a copy of the joint_df, and make some adjustments.
@@ -0,0 +1,188 @@
+import hashlib
+from collections import OrderedDict
+import pandas as pd
+import numpy as np
+'''
+Rolling, backtestable forecasts of monthly series (e.g. the lbs / customer_id columns of
+b2b_sales.monthly_sales_vs_customers). The model is a linear trend plus month-of-year effects.
+Models for every cutoff are fitted in one batch from prefix sums of X'X and X'y, so a backtest over
+all historical cutoffs is a single batched solve. Fitted coefficients are cached by series and window
+(least recently used entries are evicted beyond MODEL_CACHE_SIZE, clear_model_cache() empties it).
+Main functions: forecast(series, horizon), backtest(series, horizon), backtest_summary(bt)
+'''
+
+MODEL_CACHE = OrderedDict()
+MODEL_CACHE_SIZE = 128
+
+
+def clear_model_cache():
+    '''
+    Drop all cached fitted models.
+    '''
+    MODEL_CACHE.clear()
+
+
+def month_numbers(index):
+    '''
+    Months since year 0 of a datetime / period index.
+    :param index: pd.DatetimeIndex or pd.PeriodIndex
+    :return: np.int64 array
+    '''
+    return np.asarray(index.year, dtype=np.int64) * 12 + np.asarray(index.month, dtype=np.int64) - 1
+
+
+def design_matrix(months, start, seasonal=True):
+    '''
+    Intercept, elapsed months and (optionally) month-of-year dummies (January is the baseline).
+    :param months: np.int64 array from month_numbers
+    :param start: month number of the first observation
+    :param seasonal: include month effects
+    :return: 2d np.array, one row per month
+    '''
+    columns = [np.ones(len(months)), (months - start).astype(float)]
+    if seasonal:
+        month_of_year = months % 12
+        columns.extend((month_of_year == m).astype(float) for m in range(1, 12))
+    return np.column_stack(columns)
+
+
+def series_key(series):
+    '''
+    Cache key of a series, based on its name, index and values.
+    '''
+    digest = hashlib.sha1(pd.util.hash_pandas_object(series, index=True).to_numpy().tobytes()).hexdigest()
+    return series.name, digest
+
+
+def fit_windows(X, y, window=None, ridge=1e-3):
+    '''
+    Least squares fit for every cutoff at once. Cutoff c uses rows [c - window, c) (all rows before c if
+    window is None). Missing y values are skipped. A small ridge penalty (not on the intercept) keeps
+    short windows and months without data solvable.
+    :param X: design matrix, n x k
+    :param y: target values, n
+    :param window: number of months in the training window, None for expanding windows
+    :param ridge: penalty
+    :return: coefficients, (n + 1) x k, row c is the model fitted on data before row c
+    '''
+    n, k = X.shape
+    observed = np.isfinite(y)
+    Xo = np.where(observed[:, np.newaxis], X, 0.)
+    yo = np.where(observed, y, 0.)
+
+    xtx = np.zeros((n + 1, k, k))
+    np.cumsum(Xo[:, :, np.newaxis] * Xo[:, np.newaxis, :], axis=0, out=xtx[1:])
+    xty = np.zeros((n + 1, k))
+    np.cumsum(Xo * yo[:, np.newaxis], axis=0, out=xty[1:])
+
+    ends = np.arange(n + 1)
+    starts = np.zeros(n + 1, dtype=np.int64) if window is None else np.maximum(ends - window, 0)
+    penalty = np.eye(k) * ridge
+    penalty[0, 0] = 0.
+    A = xtx[ends] - xtx[starts] + penalty
+    b = xty[ends] - xty[starts]
+    # the intercept is unidentified before any observation
+    A[:, 0, 0] += (A[:, 0, 0] == 0)
+    return np.linalg.solve(A, b[:, :, np.newaxis])[:, :, 0]
+
+
+def fitted_models(series, window=None, seasonal=True, ridge=1e-3):
+    '''
+    Coefficients for every cutoff of the series, cached by series and window.
+    :param series: monthly pd.Series with a datetime index
+    :return: (coefficients, month numbers of the series)
+    '''
+    months = month_numbers(series.index)
+    key = (series_key(series), window, seasonal, ridge)
+    if key in MODEL_CACHE:
+        MODEL_CACHE.move_to_end(key)
+    else:
+        X = design_matrix(months, months[0], seasonal)
+        MODEL_CACHE[key] = fit_windows(X, series.to_numpy(dtype=float), window, ridge)
+        while len(MODEL_CACHE) > MODEL_CACHE_SIZE:
+            MODEL_CACHE.popitem(last=False)
+    return MODEL_CACHE[key], months
+
+
+def month_ends(months):
+    '''
+    Month end timestamps of month numbers, same convention as resample('M').
+    '''
+    first_days = pd.to_datetime(pd.DataFrame({'year': months // 12, 'month': months % 12 + 1, 'day': 1}))
+    return pd.DatetimeIndex(first_days + pd.offsets.MonthEnd(0))
+
+
+def backtest(series, horizon=12, window=None, min_train=24, seasonal=True, ridge=1e-3):
+    '''
+    Rolling-origin backtest: for every cutoff after min_train months, forecast the next horizon months.
+    :param series: monthly pd.Series with a datetime index without gaps (resample('M')), e.g. monthly_sales.lbs
+    :param horizon: months to forecast from each cutoff
+    :param window: months in the training window, None for expanding windows
+    :param min_train: first cutoff, at least two years so every month effect is seen twice. Must be at
+    least the number of model coefficients (13 with month effects, 2 without)
+    :param seasonal: include month effects
+    :param ridge: penalty on coefficients
+    :return: dataframe with cutoff, step, date, actual, forecast and error (actual - forecast)
+    '''
+    n_params = 13 if seasonal else 2
+    if min_train < n_params:
+        raise ValueError('min_train should be at least {} months to fit the model'.format(n_params))
+    beta, months = fitted_models(series, window, seasonal, ridge)
+    n = len(series)
+    cutoffs = np.arange(min_train, n)
+    steps = np.arange(1, horizon + 1)
+    if len(cutoffs) == 0:
+        return pd.DataFrame(columns=['cutoff', 'step', 'date', 'actual', 'forecast', 'error'])
+
+    # rows being forecasted, including months after the end of the series
+    rows = cutoffs[:, np.newaxis] + steps[np.newaxis, :] - 1
+    target_months = months[0] + rows
+    X = design_matrix(target_months.ravel(), months[0], seasonal).reshape(len(cutoffs), horizon, -1)
+    predictions = np.einsum('ck,chk->ch', beta[cutoffs], X)
+
+    values = np.append(series.to_numpy(dtype=float), np.nan)
+    actual = values[np.minimum(rows, n)]
+
+    out = pd.DataFrame({'cutoff': np.repeat(series.index[cutoffs - 1], horizon),
+                        'step': np.tile(steps, len(cutoffs)),
+                        'date': month_ends(target_months.ravel()),
+                        'actual': actual.ravel(),
+                        'forecast': predictions.ravel()})
+    out['error'] = out.actual - out.forecast
+    return out
+
+
+def backtest_summary(bt):
+    '''
+    Forecast accuracy by horizon step.
+    :param bt: dataframe returned by backtest
+    :return: dataframe indexed by step with n, mae, rmse and mape
+    '''
+    bt = bt.dropna(subset=['error'])
+    abs_error = bt.error.abs()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = (abs_error / bt.actual.abs()).replace(np.inf, np.nan)
+    grouped = pd.DataFrame({'step': bt.step, 'abs_error': abs_error,
+                            'sq_error': bt.error ** 2, 'pct_error': pct}).groupby('step')
+    return pd.DataFrame({'n': grouped.size(),
+                         'mae': grouped.abs_error.mean(),
+                         'rmse': np.sqrt(grouped.sq_error.mean()),
+                         'mape': grouped.pct_error.mean()})
+
+
+def forecast(series, horizon=12, window=None, seasonal=True, ridge=1e-3):
+    '''
+    Forecast the months after the end of the series with the model fitted on all (or the last window) months.
+    :param series: monthly pd.Series with a datetime index, e.g. monthly_sales.lbs
+    :param horizon: months to forecast
+    :param window: months in the training window, None for all history
+    :param seasonal: include month effects
+    :param ridge: penalty on coefficients
+    :return: dataframe indexed by month end with forecast and month (name) columns
+    '''
+    beta, months = fitted_models(series, window, seasonal, ridge)
+    future = months[-1] + np.arange(1, horizon + 1)
+    X = design_matrix(future, months[0], seasonal)
+    dates = month_ends(future)
+    return pd.DataFrame({'forecast': X.dot(beta[len(series)]),
+                         'month': dates.strftime('%b')}, index=dates)
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
-from cleaning_skus import sku_header_detail_combination
+from .cleaning_skus import sku_header_detail_combination
+from .measures import compute_measures
 '''
 This script is used to merge all transactions 2014-01-01 to 2017-09-01 with sku information df.
 Main function clean_transactions(df, skus)
@@ -17,8 +18,7 @@ def join_transactions(df, skus):
     df = filter_date(df)
     df = rm_zero_trans(df)
     joint_df = merge_sku_info(df, skus)
-    joint_df = compute_lbs(joint_df)
-    joint_df = compute_unit_price(joint_df)
+    joint_df = compute_measures(joint_df)
 
     # convert created_at to datetime
     joint_df['created_at'] = pd.to_datetime(joint_df.created_at)
@@ -76,24 +76,6 @@ def merge_sku_info(df, skus):
     return incld_df
 
 
-def compute_lbs(df):
-    '''
-    Calculate total weight by multiply quantity with unit weight.
-    :param df: df
-    :return: calculated df.
-    '''
-    df['lbs'] = df['unit_lbs'].multiply(df['quantity'])
-    return df
-
-def compute_unit_price(df):
-    '''
-    Calculate unit price.
-    :param df: df
-    :return: calculated df.
-    '''
-    df['unit_price'] = np.divide(df.loc[:, ['price']], df.loc[:, ['unit_lbs']])
-    return df
-
 def clean_transactions(file):
     '''
     Read transaction csv as dataframe.
@@ -107,17 +89,17 @@ def clean_transactions(file):
     return df
 
 
-def join_transaction_sku(file1, file2, file3, file4):
+def join_transaction_sku(file1, file2, file3, file4, fuzzy_match=False):
     '''
     Combining all the information, to make a large joint df.
     :param file1: 'csv/workshop_skus_alltrans.csv'
     :param file2: 'csv/SKU_header.csv'
     :param file3: 'csv/SKU_detail.csv'
     :param file4: 'csv/cw_transactions.csv'
+    :param fuzzy_match: match undocumented SKUs to documented ones by item name (see cleaning_skus.match_unknown)
     :return: joint df.
     '''
-    from cleaning_skus import sku_header_detail_combination
-    skus = sku_header_detail_combination(file1, file2, file3, fileoutput=False)
+    skus = sku_header_detail_combination(file1, file2, file3, fileoutput=False, fuzzy_match=fuzzy_match)
     trans = clean_transactions(file4)
     df = join_transactions(trans, skus)
     return df
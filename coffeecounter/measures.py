@@ -0,0 +1,108 @@
+import pandas as pd
+import numpy as np
+'''
+Per-line measures (lbs, unit price, revenue) and mergeable running aggregates.
+Aggregates only hold counts and sums, so partial results from chunks or partitions
+can be added together and still give exact means, variances and lbs-weighted prices.
+Main functions: compute_measures(df), group_stats(df, keys), merge_stats(*stats), summarize_stats(stats)
+'''
+
+def compute_measures(df):
+    '''
+    Calculate lbs, unit price and revenue of every transaction line with numpy column operations.
+    lbs = unit_lbs * quantity, unit_price = price / unit_lbs, revenue = price * quantity.
+    :param df: df with price, quantity and unit_lbs columns
+    :return: calculated df.
+    '''
+    price = df['price'].to_numpy(dtype=float)
+    quantity = df['quantity'].to_numpy(dtype=float)
+    unit_lbs = df['unit_lbs'].to_numpy(dtype=float)
+
+    df['lbs'] = np.multiply(unit_lbs, quantity)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['unit_price'] = np.divide(price, unit_lbs)
+    df['revenue'] = np.multiply(price, quantity)
+    return df
+
+
+def group_stats(df, keys):
+    '''
+    Running aggregates of one chunk of transactions, grouped by keys.
+    Lines without a finite unit price or lbs are ignored.
+    :param df: df with unit_price and lbs columns (see compute_measures), revenue is
+    used when present and otherwise taken as unit_price * lbs
+    :param keys: list of column names to group by, empty list for a single total row
+    :return: dataframe indexed by keys with columns count, lbs, revenue, price_sum, price_sq_sum
+    '''
+    price = df['unit_price'].to_numpy(dtype=float)
+    lbs = df['lbs'].to_numpy(dtype=float)
+    mask = np.isfinite(price) & np.isfinite(lbs)
+    if 'revenue' in df:
+        revenue = df['revenue'].to_numpy(dtype=float)
+        mask &= np.isfinite(revenue)
+
+    # zero out ignored lines before any arithmetic
+    price = np.where(mask, price, 0.0)
+    lbs = np.where(mask, lbs, 0.0)
+    revenue = np.where(mask, revenue, 0.0) if 'revenue' in df else price * lbs
+    parts = pd.DataFrame({'count': mask.astype(np.int64),
+                          'lbs': lbs,
+                          'revenue': revenue,
+                          'price_sum': price,
+                          'price_sq_sum': price * price},
+                         index=df.index)
+    if len(keys) == 0:
+        # transposing a summed Series upcasts count to float, restore the column dtypes
+        return parts.sum().to_frame().T.astype(parts.dtypes)
+    parts = parts.join(df.loc[:, keys])
+    return parts.groupby(keys).sum()
+
+
+def merge_stats(*stats):
+    '''
+    Combine running aggregates of several chunks / partitions. Exact, order does not matter.
+    :param stats: dataframes returned by group_stats (same keys)
+    :return: merged aggregates.
+    '''
+    stats = [s for s in stats if s is not None]
+    if len(stats) == 1:
+        return stats[0]
+    merged = pd.concat(stats)
+    if merged.index.names == [None]:
+        return merged.sum().to_frame().T.astype(merged.dtypes)
+    return merged.groupby(level=list(range(merged.index.nlevels))).sum()
+
+
+def stream_stats(chunks, keys):
+    '''
+    Fold an iterable of transaction chunks into running aggregates, e.g. pd.read_csv(..., chunksize=n).
+    :param chunks: iterable of dataframes with price, quantity and unit_lbs columns
+    :param keys: list of column names to group by
+    :return: merged aggregates.
+    '''
+    stats = None
+    for chunk in chunks:
+        stats = merge_stats(stats, group_stats(compute_measures(chunk), keys))
+    return stats
+
+
+def summarize_stats(stats):
+    '''
+    Turn running aggregates into final metrics.
+    mean_price is the unweighted mean of per-line unit prices, weighted_price is weighted by lbs
+    (total revenue / total lbs). std_price is the population standard deviation (ddof=0),
+    unlike pandas .std() which defaults to the sample standard deviation (ddof=1).
+    :param stats: dataframe returned by group_stats or merge_stats
+    :return: dataframe with count, lbs, revenue, mean_price, std_price and weighted_price.
+    '''
+    count = stats['count'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = stats['price_sum'].to_numpy(dtype=float) / count
+        var = stats['price_sq_sum'].to_numpy(dtype=float) / count - mean * mean
+        weighted = stats['revenue'].to_numpy(dtype=float) / stats['lbs'].to_numpy(dtype=float)
+
+    out = stats.loc[:, ['count', 'lbs', 'revenue']].copy()
+    out['mean_price'] = mean
+    out['std_price'] = np.sqrt(np.clip(var, 0, None))
+    out['weighted_price'] = weighted
+    return out
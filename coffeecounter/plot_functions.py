@@ -1,5 +1,3 @@
-import matplotlib.pyplot as plt
-
 def plot_trend_and_relationships(timeseries, x, y, time_locations='columns', xylabels=('x_label', 'y_label'),
                                  savefig = ''):
     '''
@@ -14,6 +12,7 @@ def plot_trend_and_relationships(timeseries, x, y, time_locations='columns', xyl
     '''
 
     # Initial Setup
+    import matplotlib.pyplot as plt
     fig = plt.figure(figsize=(6, 6))
     ax1 = fig.add_subplot(2, 2, 1)
     ax2 = fig.add_subplot(2, 2, 2)
@@ -1,5 +1,3 @@
-import matplotlib.pyplot as plt
-
 def linear_regression(df_x, df_y, savefig=True):
     '''
     Taking one dimensional x and one dimensional y, fit a linear regression model.
@@ -8,6 +6,7 @@ def linear_regression(df_x, df_y, savefig=True):
     :param savefig: if true, a picture will be saved.
     :return: the linear regression model.
     '''
+    import matplotlib.pyplot as plt
     from sklearn import linear_model
     from sklearn.metrics import mean_squared_error, r2_score
 
@@ -39,24 +38,3 @@ def linear_regression(df_x, df_y, savefig=True):
 
     return lr
 
-
-def forecast_b2b(year, reg1, reg2):
-    '''
-    year: the year you want to predict
-    reg1: year to customer numbers regressor
-    reg2: customer numbers to monthly sales regressor
-    return: forecast sales break down in months.
-    '''
-    start_month = (year - 2015) * 12 + 1
-    months = np.linspace(start_month, start_month + 11, 12).reshape(-1, 1)
-    predicted_customers = reg1.predict(months).reshape(-1, 1)
-    for customer in predicted_customers:
-        print(customer)
-    monthly_sales_of_year = reg2.predict(predicted_customers)
-
-    df = pd.DataFrame(monthly_sales_of_year, columns=['monthly_sales_forecast'])
-    idx = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-           'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    df['month'] = idx
-
-    return df
@@ -1,8 +1,6 @@
 import pandas as pd
 import numpy as np
 
-from join_transaction import join_transaction_sku
-
 
 def splitting_channels(df, output = ''):
     '''
@@ -38,6 +36,8 @@ def splitting_channels(df, output = ''):
 
 if __name__ == '__main__':
 
+    from .join_transaction import join_transaction_sku
+
     print('Running selling_channel_split as a main file.')
     df = join_transaction_sku('csv/workshop_skus_alltrans.csv',
                          'csv/SKU_header.csv',
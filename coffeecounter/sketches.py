@@ -0,0 +1,350 @@
+import struct
+import pandas as pd
+import numpy as np
+'''
+Mergeable, serializable sketches for large rollups.
+HyperLogLog estimates distinct customer_id counts, KLL estimates unit price quantiles.
+Sketches of different chunks / partitions / months can be merged without rescanning raw transactions.
+Main functions: hll_by_group(df, keys), kll_by_group(df, keys), merge_sketches(*series), cumulative_distinct(series)
+'''
+
+
+def hash_values(values):
+    '''
+    64 bit hash of ids, stable across runs. Integral numbers hash as int64 whatever their dtype,
+    so 1 and 1.0 (an int customer_id column that became float through a NaN) give the same hash.
+    Other values (str ids, non integral numbers) hash as their string.
+    :param values: array-like of ids
+    :return: np.uint64 array
+    '''
+    values = pd.Series(values)
+    if pd.api.types.is_integer_dtype(values.dtype) and not values.hasnans:
+        return pd.util.hash_array(values.to_numpy(dtype=np.int64))
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        numbers = values.to_numpy(dtype=float, na_value=np.nan)
+    else:
+        numbers = pd.to_numeric(values.where(values.map(type) != str), errors='coerce').to_numpy(dtype=float)
+    integral = np.isfinite(numbers) & (numbers == np.floor(numbers)) & (np.abs(numbers) < 2. ** 63)
+    hashes = np.empty(len(values), dtype=np.uint64)
+    hashes[integral] = pd.util.hash_array(numbers[integral].astype(np.int64))
+    hashes[~integral] = pd.util.hash_array(np.asarray(values[~integral].astype(str), dtype=object))
+    return hashes
+
+
+def bit_length(x):
+    '''
+    Vectorized bit length of uint64 values (0 for 0).
+    :param x: np.uint64 array
+    :return: np.uint8 array
+    '''
+    x = x.copy()
+    n = np.zeros(x.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = x >= (np.uint64(1) << np.uint64(shift))
+        n[mask] += shift
+        x[mask] >>= np.uint64(shift)
+    n[x > 0] += 1
+    return n
+
+
+class HyperLogLog(object):
+    '''
+    HyperLogLog distinct counter with 2**p one-byte registers (relative error ~1.04 / sqrt(2**p)).
+    '''
+
+    def __init__(self, p=12, registers=None):
+        if not 4 <= p <= 18:
+            raise ValueError('p should be between 4 and 18')
+        self.p = p
+        self.m = 1 << p
+        if registers is None:
+            registers = np.zeros(self.m, dtype=np.uint8)
+        self.registers = registers
+
+    @staticmethod
+    def positions(hashes, p):
+        '''
+        Register index and rank of every hash.
+        :param hashes: np.uint64 array
+        :param p: precision
+        :return: (index array, rank array)
+        '''
+        idx = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        rank = (64 - p) - bit_length(rest) + 1
+        return idx, rank.astype(np.uint8)
+
+    def update(self, values):
+        '''
+        Add values to the sketch.
+        :param values: array-like of ids
+        :return: self
+        '''
+        idx, rank = self.positions(hash_values(values), self.p)
+        np.maximum.at(self.registers, idx, rank)
+        return self
+
+    def merge(self, other):
+        '''
+        Union with another sketch of the same precision.
+        :param other: HyperLogLog
+        :return: new merged HyperLogLog
+        '''
+        if other.p != self.p:
+            raise ValueError('Cannot merge HyperLogLog sketches with different precision')
+        return HyperLogLog(self.p, np.maximum(self.registers, other.registers))
+
+    def count(self):
+        '''
+        Estimated number of distinct values.
+        :return: float
+        '''
+        return estimate_registers(self.registers[np.newaxis, :])[0]
+
+    def to_bytes(self):
+        return struct.pack('<B', self.p) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        p = struct.unpack_from('<B', data)[0]
+        return cls(p, np.frombuffer(data, dtype=np.uint8, offset=1).copy())
+
+
+def estimate_registers(registers):
+    '''
+    HyperLogLog estimate for each row of a register matrix, with linear counting for small ranges.
+    :param registers: 2d np.uint8 array, one sketch per row
+    :return: np.float64 array of estimates
+    '''
+    m = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(float)), axis=1)
+    zeros = np.count_nonzero(registers == 0, axis=1)
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+MASK64 = (1 << 64) - 1
+
+
+def coin(seed, level, compactions, pivot):
+    '''
+    Pseudo random bit of a KLL compaction: splitmix64 of the seed, the level, the number of
+    compactions of that level so far and the bits of an item being compacted.
+    Deterministic, but independent between compactions and between merged partitions.
+    :return: 0 or 1
+    '''
+    x = seed ^ (level << 56) ^ (compactions << 24) ^ int(np.float64(pivot).view(np.uint64))
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return (x ^ (x >> 31)) & 1
+
+
+class KLL(object):
+    '''
+    KLL quantile sketch. Level h holds items of weight 2**h; a full level is sorted and
+    every other item is promoted to the next level. Rank error is roughly 1.7 / k.
+    Whether odd or even items are promoted is a seeded coin per compaction (see coin), so the same
+    data gives the same sketch on every run, while repeated merges do not reuse the same flips.
+    '''
+
+    def __init__(self, k=200, levels=None, seed=0, compactions=None):
+        self.k = k
+        self.levels = levels if levels is not None else [np.empty(0)]
+        self.seed = seed
+        # compactions done so far at each level, the state of the coins
+        self.compactions = compactions if compactions is not None else [0] * len(self.levels)
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3.) ** depth)), 2)
+
+    def update(self, values):
+        '''
+        Add values to the sketch. NaN values are ignored.
+        :param values: array-like of numbers
+        :return: self
+        '''
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.compress()
+        return self
+
+    def compress(self):
+        level = 0
+        while level < len(self.levels):
+            while len(self.levels[level]) > self.capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                    self.compactions.append(0)
+                items = np.sort(self.levels[level])
+                # an odd item stays at this level so total weight is preserved
+                keep = items[:len(items) % 2]
+                items = items[len(items) % 2:]
+                offset = coin(self.seed, level, self.compactions[level], items[len(items) // 2])
+                promoted = items[offset::2]
+                self.compactions[level] += 1
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def merge(self, other):
+        '''
+        Combine with another sketch.
+        :param other: KLL
+        :return: new merged KLL
+        '''
+        depth = max(len(self.levels), len(other.levels))
+        levels = [np.concatenate([self.levels[h] if h < len(self.levels) else np.empty(0),
+                                  other.levels[h] if h < len(other.levels) else np.empty(0)])
+                  for h in range(depth)]
+        compactions = [(self.compactions[h] if h < len(self.levels) else 0) +
+                       (other.compactions[h] if h < len(other.levels) else 0)
+                       for h in range(depth)]
+        merged = KLL(max(self.k, other.k), levels, self.seed, compactions)
+        merged.compress()
+        return merged
+
+    def count(self):
+        return int(sum(len(items) << h for h, items in enumerate(self.levels)))
+
+    def quantile(self, q):
+        '''
+        Estimated quantile(s).
+        :param q: float or array of floats in [0, 1]
+        :return: float or np.array
+        '''
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        weights = np.concatenate([np.full(len(items_h), 2. ** h) for h, items_h in enumerate(self.levels)])
+        order = np.argsort(items, kind='mergesort')
+        cum = np.cumsum(weights[order])
+        pos = np.searchsorted(cum, np.asarray(q) * cum[-1], side='left')
+        return items[order][np.minimum(pos, len(items) - 1)]
+
+    def to_bytes(self):
+        data = struct.pack('<IQI', self.k, self.seed, len(self.levels))
+        for items, compactions in zip(self.levels, self.compactions):
+            data += struct.pack('<IQ', len(items), compactions) + np.asarray(items, dtype='<f8').tobytes()
+        return data
+
+    @classmethod
+    def from_bytes(cls, data):
+        k, seed, depth = struct.unpack_from('<IQI', data)
+        offset = struct.calcsize('<IQI')
+        levels = []
+        compactions = []
+        for _ in range(depth):
+            n, done = struct.unpack_from('<IQ', data, offset)
+            offset += struct.calcsize('<IQ')
+            levels.append(np.frombuffer(data, dtype='<f8', count=n, offset=offset).copy())
+            compactions.append(done)
+            offset += 8 * n
+        return cls(k, levels, seed, compactions)
+
+
+def hll_by_group(df, keys, column='customer_id', p=12):
+    '''
+    One HyperLogLog sketch per group, built in a single vectorized pass.
+    :param df: transactions
+    :param keys: list of column names to group by
+    :param column: column to count distinct values of
+    :param p: HyperLogLog precision
+    :return: pd.Series of HyperLogLog indexed by keys
+    '''
+    # rows with missing keys belong to no group
+    df = df.dropna(subset=list(keys) + [column])
+    grouped = df.groupby(keys, sort=True)
+    codes = grouped.ngroup().to_numpy(dtype=np.int64)
+    idx, rank = HyperLogLog.positions(hash_values(df[column].to_numpy()), p)
+
+    registers = np.zeros((grouped.ngroups, 1 << p), dtype=np.uint8)
+    np.maximum.at(registers, (codes, idx), rank)
+
+    index = grouped.size().index
+    return pd.Series([HyperLogLog(p, row) for row in registers], index=index)
+
+
+def kll_by_group(df, keys, column='unit_price', k=200, seed=0):
+    '''
+    One KLL quantile sketch per group.
+    :param df: transactions
+    :param keys: list of column names to group by
+    :param column: numeric column to sketch
+    :param k: KLL accuracy parameter
+    :param seed: seed of the compactors
+    :return: pd.Series of KLL indexed by keys
+    '''
+    return df.groupby(keys, sort=True)[column].apply(lambda values: KLL(k, seed=seed).update(values.to_numpy()))
+
+
+def merge_sketches(*series):
+    '''
+    Merge per-group sketches of several chunks / partitions.
+    :param series: pd.Series of sketches returned by hll_by_group or kll_by_group (same keys)
+    :return: pd.Series of merged sketches.
+    '''
+    merged = pd.concat(series)
+    return merged.groupby(level=list(range(merged.index.nlevels)), sort=True).agg(
+        lambda sketches: reduce_sketches(list(sketches)))
+
+
+def reduce_sketches(sketches):
+    out = sketches[0]
+    for sketch in sketches[1:]:
+        out = out.merge(sketch)
+    return out
+
+
+def cumulative_distinct(series):
+    '''
+    Running union of HyperLogLog sketches in index order, e.g. customers seen up to each month.
+    :param series: pd.Series of HyperLogLog
+    :return: pd.Series of estimated cumulative distinct counts.
+    '''
+    if len(series) == 0:
+        return pd.Series([], index=series.index, dtype=float)
+    registers = np.maximum.accumulate(np.vstack([sketch.registers for sketch in series]), axis=0)
+    return pd.Series(estimate_registers(registers), index=series.index)
+
+
+def estimate_distinct(series):
+    '''
+    :param series: pd.Series of HyperLogLog
+    :return: pd.Series of estimated distinct counts.
+    '''
+    if len(series) == 0:
+        return pd.Series([], index=series.index, dtype=float)
+    return pd.Series(estimate_registers(np.vstack([sketch.registers for sketch in series])), index=series.index)
+
+
+def estimate_quantile(series, q):
+    '''
+    :param series: pd.Series of KLL
+    :param q: quantile in [0, 1]
+    :return: pd.Series of estimated quantiles.
+    '''
+    return series.map(lambda sketch: sketch.quantile(q))
+
+
+def serialize_sketches(series):
+    '''
+    Sketches to bytes, so partitioned or incremental runs can store and merge them later.
+    :param series: pd.Series of sketches
+    :return: pd.Series of bytes
+    '''
+    return series.map(lambda sketch: sketch.to_bytes())
+
+
+def deserialize_sketches(series, kind):
+    '''
+    :param series: pd.Series of bytes
+    :param kind: 'hll' or 'kll'
+    :return: pd.Series of sketches
+    '''
+    cls = {'hll': HyperLogLog, 'kll': KLL}[kind]
+    return series.map(cls.from_bytes)
@@ -0,0 +1,320 @@
+import re
+from itertools import repeat
+import pandas as pd
+import numpy as np
+'''
+Fuzzy matching of undocumented item names to documented catalog items.
+Documented items are indexed by word tokens and character trigrams (tf-idf weighted token x item matrix),
+undocumented names are scored against every item in vectorized batches and the best item above a threshold wins.
+Main usage: SkuMatcher(documented_df).match(item_names, threshold=0.5)
+'''
+
+TEXT_COLUMNS = ['item_name', 'sub_name', 'origin']
+
+# token codes: padded character trigrams are 3 bytes (< 2**24), word tokens are offset above them
+WORD_OFFSET = 1 << 24
+
+# normalize: names are joined by NUL, every byte but a-z, 0-9 and NUL becomes a space
+SEPARATOR = '\x00'
+KEEP_ALNUM = bytes(c if c == 0 or ord('0') <= c <= ord('9') or ord('a') <= c <= ord('z') else ord(' ')
+                   for c in range(256))
+
+
+def normalize(names):
+    '''
+    Lower case, keep letters and digits only, single spaces.
+    All names are cleaned together as one joined text, instead of one regex call per name.
+    :param names: pd.Series of strings
+    :return: pd.Series of normalized strings
+    '''
+    names = names.fillna('').astype(str)
+    # non ascii characters become '?' and then spaces, like every other character but a-z and 0-9
+    text = SEPARATOR.join(names.tolist()).lower().encode('ascii', 'replace').translate(KEEP_ALNUM)
+    text = re.sub(b'  +', b' ', text).replace(b' \x00', b'\x00').replace(b'\x00 ', b'\x00').strip(b' ')
+    parts = text.decode('ascii').split(SEPARATOR)
+    if len(parts) != len(names):
+        # a name contains the separator itself
+        return names.str.lower().str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip()
+    return pd.Series(parts, index=names.index)
+
+
+def ragged_arange(lengths):
+    '''
+    Concatenation of arange(n) for every n in lengths, e.g. [2, 3] -> [0, 1, 0, 1, 2].
+    :param lengths: np.int64 array
+    :return: np.int64 array
+    '''
+    return np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+
+def distinct_pairs(rows, codes, space):
+    '''
+    Distinct (row, code) pairs, sorted.
+    :param rows: np.int64 array
+    :param codes: np.int64 array, all < space
+    :param space: bound of the codes
+    :return: (row array, code array)
+    '''
+    keys = np.sort(rows * space + codes)
+    keys = keys[np.diff(keys, prepend=-1) != 0]
+    return keys // space, keys % space
+
+
+def trigrams(words):
+    '''
+    Character trigrams of ' word ' for every word, as integer codes.
+    :param words: array of normalized words (ascii)
+    :return: (word position array, code array)
+    '''
+    raw = np.array(words, dtype='S')
+    lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+    # ' word ', the NUL padding of shorter words counts as trailing spaces
+    width = raw.dtype.itemsize + 2
+    chars = np.full((len(words), width), ord(' '), dtype=np.int64)
+    chars[:, 1:-1] = raw.view(np.uint8).reshape(len(words), raw.dtype.itemsize)
+    chars[chars == 0] = ord(' ')
+    codes = (chars[:, :-2] << 16) | (chars[:, 1:-1] << 8) | chars[:, 2:]
+    rows, cols = np.nonzero(np.arange(width - 2) < lengths[:, np.newaxis])
+    return rows, codes[rows, cols]
+
+
+def split_words(names):
+    '''
+    Distinct words of every normalized name. All names are split at once and the words factorized once.
+    :param names: list of normalized names (single spaces)
+    :return: (row array, word position array) of distinct (name, word) pairs sorted by row, distinct words
+    '''
+    spaces = np.fromiter(map(str.count, names, repeat(' ')), dtype=np.int64, count=len(names))
+    n_words = np.where(np.fromiter(map(bool, names), dtype=bool, count=len(names)), spaces + 1, 0)
+    codes, words = pd.factorize(np.array(' '.join(names).split(), dtype=object))
+    rows, codes = distinct_pairs(np.repeat(np.arange(len(names)), n_words), codes, max(len(words), 1))
+    return rows, codes, np.asarray(words, dtype=object)
+
+
+def word_tokens(words):
+    '''
+    Distinct tokens of every word: its trigrams, and the word itself coded WORD_OFFSET + position in words.
+    :param words: array of distinct normalized words
+    :return: (word position array, code array) sorted by word
+    '''
+    tri_rows, tri_codes = trigrams(words)
+    rows = np.concatenate([tri_rows, np.arange(len(words))])
+    codes = np.concatenate([tri_codes, WORD_OFFSET + np.arange(len(words))])
+    return distinct_pairs(rows, codes, WORD_OFFSET + len(words))
+
+
+def token_keys(rows, word_ids, word_rows, word_codes):
+    '''
+    Tokens of the words of every name, as sorted keys row * space + token.
+    A token in several words of a name is repeated once per word.
+    :param rows, word_ids: (name, word) pairs from split_words
+    :param word_rows, word_codes: (word, token) pairs from word_tokens, sorted by word
+    :return: (key array, space)
+    '''
+    if len(word_codes) == 0:
+        return np.empty(0, dtype=np.int64), 1
+    word_lengths = np.bincount(word_rows, minlength=word_ids.max(initial=-1) + 1)
+    word_ptr = np.cumsum(word_lengths) - word_lengths
+    lengths = word_lengths[word_ids]
+    offsets = np.cumsum(lengths) - lengths
+    tokens = word_codes[np.arange(lengths.sum()) + np.repeat(word_ptr[word_ids] - offsets, lengths)]
+    space = word_codes.max() + 1
+    return np.sort(np.repeat(rows, lengths) * space + tokens), space
+
+
+def name_tokens(names, encode=None):
+    '''
+    Distinct (row, token code) pairs of normalized names. Every distinct word is tokenized once.
+    Word tokens are coded WORD_OFFSET + position in the returned distinct words.
+    :param names: list of normalized names
+    :param encode: optional function (codes, distinct words) -> non-negative ids, applied once per distinct word
+    :return: (row array, code (or id) array, distinct words)
+    '''
+    rows, word_ids, words = split_words(names)
+    word_rows, codes = word_tokens(words)
+    if encode is not None:
+        codes = encode(codes, words)
+    keys, space = token_keys(rows, word_ids, word_rows, codes)
+    keys = keys[np.diff(keys, prepend=-1) != 0]
+    return keys // space, keys % space, words
+
+
+def sum_rows(values, groups, rows, n_groups):
+    '''
+    Sum of the rows values[r] of every pair (g, r) per group g.
+    Groups are laid out by decreasing number of pairs, so the j-th pairs of all groups are added to a
+    contiguous block of the output at once, without scattered writes.
+    :param values: 2d array
+    :param groups: sorted np.int64 array, all < n_groups
+    :param rows: np.int64 array of rows of values
+    :param n_groups: number of output rows
+    :return: (n_groups, values.shape[1]) array
+    '''
+    counts = np.bincount(groups, minlength=n_groups)
+    by_size = np.argsort(-counts, kind='stable')
+    rank = np.empty_like(by_size)
+    rank[by_size] = np.arange(n_groups)
+    order = np.lexsort((rank[groups], ragged_arange(counts)))
+    # groups with more than j pairs, for every j
+    sizes = np.searchsorted(-counts[by_size], -np.arange(counts.max(initial=0)), side='left')
+    out = np.zeros((n_groups, values.shape[1]), dtype=values.dtype)
+    start = 0
+    for size in sizes:
+        out[:size] += values.take(rows[order[start:start + size]], axis=0)
+        start += size
+    return out[rank]
+
+
+class SkuMatcher(object):
+    '''
+    Index of documented catalog items. Match results are cached per normalized name (cache: dataframe of
+    match and score indexed by name), so repeated batches (e.g. every season's transaction SKUs) only score new names.
+    '''
+
+    def __init__(self, catalog, text_columns=TEXT_COLUMNS, max_df=0.5):
+        '''
+        :param catalog: dataframe of documented items, one row per item
+        :param text_columns: columns joined into the indexed text
+        :param max_df: ignore tokens present in more than this share of items (carry little information)
+        '''
+        self.catalog = catalog.reset_index(drop=True)
+        self.cache = pd.DataFrame({'match': pd.Series(dtype=np.int64), 'score': pd.Series(dtype=float)})
+        n_docs = len(self.catalog)
+
+        texts = self.catalog.loc[:, text_columns].fillna('').astype(str).agg(' '.join, axis=1)
+        docs, codes, words = name_tokens(normalize(texts).tolist())
+
+        # vocabulary: sorted trigram codes, then words
+        tokens, doc_freq = np.unique(codes, return_counts=True)
+        is_word = tokens >= WORD_OFFSET
+        self.trigrams = tokens[~is_word]
+        self.words = pd.Index(words[tokens[is_word] - WORD_OFFSET])
+        doc_freq = np.concatenate([doc_freq[~is_word], doc_freq[is_word]])
+        self.idf = np.log((1. + n_docs) / (1. + doc_freq)) + 1
+        # weight of tokens never seen in the catalog, they still count against the query norm
+        self.unseen_idf = np.log(1. + n_docs) + 1
+
+        # token x item matrix of idf * normalized item weight, so a name's cosine with every item is the
+        # sum of the rows of its tokens over the name norm. Very common tokens count in the norms but have a zero row
+        token_ids = self.lookup(codes, words)
+        weights = self.idf[token_ids]
+        norms = np.sqrt(np.bincount(docs, weights=weights ** 2, minlength=n_docs))
+        weights = weights / np.where(norms > 0, norms, 1)[docs]
+        indexed = doc_freq[token_ids] <= max(max_df * n_docs, 1)
+        self.token_weights = np.zeros((len(self.idf), n_docs), dtype=np.float32)
+        self.token_weights[token_ids[indexed], docs[indexed]] = (self.idf[token_ids] * weights)[indexed]
+
+    def lookup(self, codes, words):
+        '''
+        Map token codes from name_tokens to vocabulary ids, -1 if not in the vocabulary.
+        :param codes: token codes
+        :param words: distinct words returned with the codes
+        :return: np.int64 array of ids
+        '''
+        ids = np.full(len(codes), -1, dtype=np.int64)
+        is_word = codes >= WORD_OFFSET
+
+        if len(self.trigrams):
+            pos = np.minimum(np.searchsorted(self.trigrams, codes[~is_word]), len(self.trigrams) - 1)
+            ids[~is_word] = np.where(self.trigrams[pos] == codes[~is_word], pos, -1)
+
+        word_ids = self.words.get_indexer(words)[codes[is_word] - WORD_OFFSET]
+        ids[is_word] = np.where(word_ids >= 0, word_ids + len(self.trigrams), -1)
+        return ids
+
+    def encode(self, codes, words):
+        '''
+        Like lookup, but tokens out of the vocabulary keep distinct ids >= len(idf) instead of -1.
+        '''
+        ids = self.lookup(codes, words)
+        return np.where(ids >= 0, ids, len(self.idf) + codes)
+
+    def query_weights(self, token_ids):
+        '''
+        idf of token ids from encode, tokens out of the vocabulary get unseen_idf.
+        '''
+        known = token_ids < len(self.idf)
+        return np.where(known, self.idf[np.where(known, token_ids, 0)], self.unseen_idf)
+
+    def score(self, names, batch_size=20000):
+        '''
+        Best catalog item and cosine score of every (normalized, distinct) name, scored against every item.
+        The item scores of each distinct word are computed once; a name sums the scores of its words, minus
+        the tokens shared by several of its words, which count once.
+        :param names: list of normalized names
+        :param batch_size: names tokenized at once
+        :return: (catalog row array, score array). Names without any indexed token get -1 and 0.
+        '''
+        n_docs = len(self.catalog)
+        best_doc = np.full(len(names), -1, dtype=np.int64)
+        best_score = np.zeros(len(names))
+        if len(names) == 0 or n_docs == 0:
+            return best_doc, best_score
+        # names whose name x item scores fit in cache together
+        block = max(1, 150000 // n_docs)
+
+        for start in range(0, len(names), batch_size):
+            batch = names[start:start + batch_size]
+            rows, word_ids, words = split_words(batch)
+            word_rows, token_ids = word_tokens(words)
+            token_ids = self.encode(token_ids, words)
+            # tokens a name has in more than one word, once per extra word
+            keys, space = token_keys(rows, word_ids, word_rows, token_ids)
+            extra = keys[1:][keys[1:] == keys[:-1]]
+            extra_rows, extra_tokens = extra // space, extra % space
+
+            # query norms over distinct tokens, including tokens the catalog has never seen
+            word_norms = np.bincount(word_rows, weights=self.query_weights(token_ids) ** 2, minlength=len(words))
+            q_norms = np.sqrt(np.maximum(
+                np.bincount(rows, weights=word_norms[word_ids], minlength=len(batch)) -
+                np.bincount(extra_rows, weights=self.query_weights(extra_tokens) ** 2, minlength=len(batch)), 0))
+
+            # item scores of the distinct words with tokens in the vocabulary
+            known = token_ids < len(self.idf)
+            has_known = np.bincount(word_rows[known], minlength=len(words)) > 0
+            slots = np.cumsum(has_known) - 1
+            word_scores = sum_rows(self.token_weights, slots[word_rows[known]], token_ids[known], has_known.sum())
+            # a name sums the scores of its words, less one row per extra word holding a shared token
+            known = extra_tokens < len(self.idf)
+            shared, shared_ids = np.unique(extra_tokens[known], return_inverse=True)
+            values = np.vstack([word_scores, -self.token_weights[shared]])
+            used = has_known[word_ids]
+            rows = np.concatenate([rows[used], extra_rows[known]])
+            order = np.argsort(rows, kind='stable')
+            sources = np.concatenate([slots[word_ids[used]], len(word_scores) + shared_ids])[order]
+            rows = rows[order]
+
+            for lo in range(0, len(batch), block):
+                hi = min(lo + block, len(batch))
+                a, b = np.searchsorted(rows, [lo, hi])
+                scores = sum_rows(values, rows[a:b] - lo, sources[a:b], hi - lo)
+                best = scores.argmax(axis=1)
+                top = scores[np.arange(hi - lo), best] / np.where(q_norms[lo:hi] > 0, q_norms[lo:hi], 1)
+                best_doc[start + lo:start + hi] = np.where(top > 0, best, -1)
+                best_score[start + lo:start + hi] = np.maximum(top, 0)
+        return best_doc, best_score
+
+    def match(self, names, threshold=0.5):
+        '''
+        Match item names to the best documented catalog item.
+        :param names: iterable of item names
+        :param threshold: minimum cosine score (0-1) to accept a match
+        :return: dataframe aligned with names: item_name, match (catalog row position, -1 if none), score.
+        Missing names get match -1 and score 0.
+        '''
+        names = pd.Series(list(names), dtype=object)
+        # missing names get code -1
+        codes, distinct = pd.factorize(names)
+        distinct = normalize(pd.Series(distinct, dtype=object))
+        new = distinct[~distinct.isin(self.cache.index)].unique()
+        docs, scores = self.score(new.tolist())
+        found = pd.DataFrame({'match': docs, 'score': scores}, index=new)
+        self.cache = pd.concat([self.cache, found]) if len(self.cache) else found
+
+        # the last row answers code -1
+        cached = self.cache.index.get_indexer(distinct)
+        docs = np.append(self.cache.match.to_numpy()[cached], -1)
+        scores = np.append(self.cache.score.to_numpy()[cached], 0.)
+        out = pd.DataFrame({'item_name': names, 'match': docs[codes], 'score': scores[codes]})
+        out.loc[out.score < threshold, 'match'] = -1
+        return out
@@ -1,14 +1,16 @@
 import pandas as pd
-from join_transaction import join_transaction_sku
-from selling_channel_split import splitting_channels
+from .measures import group_stats, summarize_stats
+from .sketches import hll_by_group, kll_by_group, estimate_distinct, estimate_quantile
 
 
-def to_web_data(df, b2c=False):
+def to_web_data(df, b2c=False, sketches=False):
     '''
     Creat a csv file appropiate for DC.js visuallization.
     : param df:, dataframe needs to be processed
     : b2c=False, b2c channel with extra source info about channels
-    : return a ndf that to be saved in dc.js.
+    : sketches=False, also add approximate distinct customers and median unit price (needs customer_id)
+    : return a ndf that to be saved in dc.js. unit_price is the mean of line prices,
+    weighted_price is weighted by lbs.
     : auto saves csv file in the directory.
     '''
     ndf = df.loc[:, ['created_at', 'source', 'origin', 'blend', 'roast_level', 'type', 'unit_price', 'lbs']]
@@ -23,16 +25,30 @@ def to_web_data(df, b2c=False):
         output_df['unit_price'] = ndf.groupby(['year', 'month', 'origin', 'source',
                                                'blend', 'roast_level', 'type']).mean()['unit_price'].values
         output_df.rename(columns={'lbs': 'sales'}, inplace=True)
+        keys = ['year', 'month', 'origin', 'source', 'blend', 'roast_level', 'type']
     else:
         output_df = ndf.groupby(['year', 'month', 'origin', 'blend', 'roast_level', 'type']).sum()['lbs'].reset_index()
         output_df['unit_price'] = ndf.groupby(['year', 'month', 'origin', 'blend', 'roast_level', 'type']).mean()[
             'unit_price'].values
         output_df.rename(columns={'lbs': 'sales'}, inplace=True)
+        keys = ['year', 'month', 'origin', 'blend', 'roast_level', 'type']
+
+    # lbs-weighted average price, from mergeable running aggregates
+    stats = summarize_stats(group_stats(ndf, keys))
+    output_df['weighted_price'] = stats['weighted_price'].values
+
+    # approximate distinct customers / price quantiles, mergeable across partitions
+    if sketches:
+        sdf = ndf.join(df.loc[ndf.index, ['customer_id']])
+        output_df['customers'] = estimate_distinct(hll_by_group(sdf, keys)).reindex(stats.index).values
+        output_df['median_price'] = estimate_quantile(kll_by_group(ndf, keys), 0.5).values
 
     return output_df
 
 #####################################################
 if __name__ == '__main__':
+    from .join_transaction import join_transaction_sku
+    from .selling_channel_split import splitting_channels
 
     all_trans = join_transaction_sku('csv/workshop_skus_alltrans.csv',
                          'csv/SKU_header.csv',
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+from coffeecounter import forecasting
+
+
+def monthly_series(n=36, seed=0):
+    rng = np.random.RandomState(seed)
+    index = pd.date_range('2015-01-01', periods=n, freq='MS') + pd.offsets.MonthEnd(0)
+    return pd.Series(100 + 3 * np.arange(n) + rng.normal(size=n), index=index, name='lbs')
+
+
+def test_fit_matches_least_squares():
+    series = monthly_series()
+    beta, months = forecasting.fitted_models(series, ridge=1e-3)
+    X = forecasting.design_matrix(months, months[0])[:30]
+    penalty = np.eye(X.shape[1]) * 1e-3
+    penalty[0, 0] = 0.
+    expected = np.linalg.solve(X.T.dot(X) + penalty, X.T.dot(series.values[:30]))
+    assert np.allclose(beta[30], expected)
+
+
+def test_model_cache_is_bounded():
+    forecasting.clear_model_cache()
+    for seed in range(forecasting.MODEL_CACHE_SIZE + 5):
+        forecasting.backtest(monthly_series(seed=seed), horizon=3)
+    assert len(forecasting.MODEL_CACHE) == forecasting.MODEL_CACHE_SIZE
+    forecasting.clear_model_cache()
+    assert len(forecasting.MODEL_CACHE) == 0
+
+
+def test_backtest_min_train_too_small():
+    for min_train, seasonal in [(0, True), (12, True), (1, False)]:
+        with pytest.raises(ValueError):
+            forecasting.backtest(monthly_series(), min_train=min_train, seasonal=seasonal)
+    assert len(forecasting.backtest(monthly_series(), horizon=1, min_train=2, seasonal=False)) == 34
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from coffeecounter.measures import compute_measures, group_stats, merge_stats, stream_stats, summarize_stats
+
+
+def transactions(n=1000, seed=0):
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame({'customer_type': rng.choice(['cafe', 'retail', 'grocery'], n),
+                         'price': rng.uniform(5, 60, n).round(2),
+                         'quantity': rng.randint(1, 10, n),
+                         'unit_lbs': rng.choice([0.75, 1., 5.], n)})
+
+
+def test_chunked_stats_match_single_pass():
+    df = transactions()
+    single = group_stats(compute_measures(df.copy()), ['customer_type'])
+    chunks = [df.iloc[start:start + 150] for start in range(0, len(df), 150)]
+    streamed = stream_stats((chunk.copy() for chunk in chunks), ['customer_type'])
+    partitioned = merge_stats(*[group_stats(compute_measures(chunk.copy()), ['customer_type'])
+                                for chunk in chunks[::-1]])
+    pd.testing.assert_frame_equal(streamed, single, check_exact=False)
+    pd.testing.assert_frame_equal(partitioned, single, check_exact=False)
+
+
+def test_keyless_stats_keep_integer_count():
+    df = compute_measures(transactions())
+    stats = merge_stats(group_stats(df.iloc[:500], []), group_stats(df.iloc[500:], []))
+    assert stats['count'].dtype == np.int64
+    assert stats['count'].iloc[0] == len(df)
+    pd.testing.assert_frame_equal(stats, group_stats(df, []), check_exact=False)
+
+
+def test_summary_matches_direct_computation():
+    df = compute_measures(transactions())
+    summary = summarize_stats(group_stats(df, ['customer_type']))
+    grouped = df.groupby('customer_type')
+    weighted = grouped['revenue'].sum() / grouped['lbs'].sum()
+    assert np.allclose(summary['weighted_price'], weighted)
+    assert np.allclose(summary['mean_price'], grouped['unit_price'].mean())
+    assert np.allclose(summary['std_price'], grouped['unit_price'].std(ddof=0))
+
+
+def test_zero_unit_lbs_ignored():
+    df = transactions(10)
+    df.loc[[2, 5], 'unit_lbs'] = 0
+    summary = summarize_stats(group_stats(compute_measures(df.copy()), []))
+    expected = compute_measures(df.drop([2, 5]))
+    assert summary['count'].iloc[0] == 8
+    assert np.isfinite(summary.loc[:, ['mean_price', 'std_price', 'weighted_price']].values).all()
+    assert np.isclose(summary['weighted_price'].iloc[0], expected['revenue'].sum() / expected['lbs'].sum())
+    assert np.isclose(summary['mean_price'].iloc[0], expected['unit_price'].mean())
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from coffeecounter.sketches import (KLL, hll_by_group, kll_by_group, merge_sketches, cumulative_distinct,
+                                      estimate_distinct, estimate_quantile)
+
+
+def test_hll_by_group_null_keys():
+    df = pd.DataFrame({'g': ['a', None, 'b', 'a'], 'customer_id': [1, 2, 3, 4]})
+    counts = estimate_distinct(hll_by_group(df, ['g']))
+    assert list(counts.index) == ['a', 'b']
+    assert np.allclose(counts.values, [2, 1], atol=0.01)
+
+
+def test_kll_by_group_reproducible():
+    rng = np.random.RandomState(1)
+    df = pd.DataFrame({'g': rng.randint(0, 3, 20000), 'unit_price': rng.normal(size=20000)})
+    first = estimate_quantile(kll_by_group(df, ['g']), 0.5)
+    second = estimate_quantile(kll_by_group(df, ['g']), 0.5)
+    assert (first.values == second.values).all()
+
+
+def test_kll_merge_partitions_rank_error():
+    values = np.random.RandomState(2).lognormal(size=200000)
+    sketches = [KLL().update(chunk) for chunk in np.array_split(values, 200)]
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        # round trip through bytes, as an incremental run would store them
+        merged = KLL.from_bytes(merged.merge(sketch).to_bytes())
+    q = np.linspace(0.01, 0.99, 99)
+    ranks = np.searchsorted(np.sort(values), merged.quantile(q)) / float(len(values))
+    assert merged.count() == len(values)
+    assert np.abs(ranks - q).max() < 0.02
+
+
+def test_hll_merge_across_id_dtypes():
+    ids = np.arange(1000)
+    as_int = pd.DataFrame({'g': 'a', 'customer_id': ids})
+    as_float = pd.DataFrame({'g': 'a', 'customer_id': np.append(ids, np.nan)})
+    merged = merge_sketches(hll_by_group(as_int, ['g']), hll_by_group(as_float, ['g']))
+    assert abs(estimate_distinct(merged)['a'] - 1000) < 50
+
+
+def test_cumulative_distinct_empty():
+    df = pd.DataFrame({'g': [], 'customer_id': []})
+    assert len(cumulative_distinct(hll_by_group(df, ['g']))) == 0
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from coffeecounter.sku_matching import SkuMatcher, normalize
+
+
+def catalog():
+    return pd.DataFrame({'item_name': ['Kenya AA 12oz', 'Brazil Santos 5lb', 'House Espresso Blend'],
+                         'sub_name': ['Kenya', 'Santos', 'Espresso'],
+                         'origin': ['Kenya', 'Brazil', 'Brazil, Colombia']})
+
+
+def test_match_best_item():
+    matches = SkuMatcher(catalog()).match(['kenya aa 5lb', 'espresso house blnd'], threshold=0.3)
+    assert list(matches.match) == [0, 2]
+
+
+def test_match_missing_names():
+    matches = SkuMatcher(catalog()).match([None, np.nan, 'Kenya AA 12oz'])
+    assert list(matches.match) == [-1, -1, 0]
+    assert list(matches.score[:2]) == [0, 0]
+
+
+def test_match_cache():
+    matcher = SkuMatcher(catalog())
+    first = matcher.match(['Kenya AA', 'kenya  aa!'])
+    assert len(matcher.cache) == 1
+    assert (matcher.match(['KENYA AA']).score.values == first.score.values[:1]).all()
+
+
+def noisy_catalog_and_names():
+    rng = np.random.RandomState(3)
+    pool = np.array(['kenya', 'brazil', 'santos', 'huila', 'espresso', 'house', 'blend', 'decaf', 'dark', 'roast',
+                     'organic', 'reserve', 'natural', 'washed', 'sidamo', 'guji', 'nyeri', 'antigua', 'honey', 'bean'])
+    items = [' '.join(rng.choice(pool, rng.randint(2, 6), replace=False)) for _ in range(80)]
+    catalog = pd.DataFrame({'item_name': items, 'sub_name': rng.choice(pool, 80), 'origin': rng.choice(pool, 80)})
+    names = []
+    for i in rng.randint(0, 80, 400):
+        words = [word[:-1] if rng.rand() < 0.3 else word for word in items[i].split() if rng.rand() > 0.2]
+        names.append(' '.join(words + [rng.choice(['12oz', '5lb', 'bag']), str(rng.randint(1000))]))
+    return catalog, names + ['', '!!!', 'zzzz']
+
+
+def exhaustive_scores(catalog, names, max_df=0.5):
+    '''Reference cosine of every name with every item, token by token.'''
+    def token_sets(texts):
+        return [set(('word', word) for word in text.split()) |
+                set(word[i:i + 3] for word in (' ' + w + ' ' for w in text.split()) for i in range(len(word) - 2))
+                for text in normalize(texts)]
+    docs = token_sets(catalog[['item_name', 'sub_name', 'origin']].astype(str).agg(' '.join, axis=1))
+    n = len(docs)
+    doc_freq = pd.Series([token for doc in docs for token in doc]).value_counts()
+    idf = dict(np.log((1. + n) / (1. + doc_freq)) + 1)
+    scores = np.zeros((len(names), n))
+    for i, name in enumerate(token_sets(pd.Series(names))):
+        q_norm = np.sqrt(sum(idf.get(token, np.log(1. + n) + 1) ** 2 for token in name))
+        for j, doc in enumerate(docs):
+            shared = [token for token in name & doc if doc_freq[token] <= max_df * n]
+            d_norm = np.sqrt(sum(idf[token] ** 2 for token in doc))
+            scores[i, j] = sum(idf[token] ** 2 for token in shared) / (q_norm * d_norm) if shared else 0
+    return scores
+
+
+def test_score_matches_exhaustive():
+    catalog, names = noisy_catalog_and_names()
+    reference = exhaustive_scores(catalog, names)
+    docs, scores = SkuMatcher(catalog).score(normalize(pd.Series(names)).tolist(), batch_size=100)
+    assert np.allclose(scores, reference.max(axis=1), atol=1e-5)
+    found = docs >= 0
+    assert np.allclose(reference[found, docs[found]], reference.max(axis=1)[found], atol=1e-5)
+    assert (found == (reference.max(axis=1) > 0)).all()
+
+
+def test_match_without_tokens():
+    matches = SkuMatcher(catalog()).match(['', '!!!'], threshold=0)
+    assert list(matches.match) == [-1, -1]